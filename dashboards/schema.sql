@@ -71,21 +71,27 @@ CREATE TABLE IF NOT EXISTS benchmark_commits (
     timestamp TIMESTAMPTZ NOT NULL,
     status VARCHAR(20) NOT NULL CHECK (status IN ('in_progress', 'complete')),
     config JSONB NOT NULL,
+    -- Fixed-size key for the config; jsonb text output is canonical
+    config_hash UUID GENERATED ALWAYS AS (md5(config::text)::uuid) STORED,
     architecture VARCHAR(50),
     created_at TIMESTAMPTZ DEFAULT NOW(),
-    updated_at TIMESTAMPTZ DEFAULT NOW(),
-    
-    -- Unique constraint: same commit + config + architecture can only exist once
-    CONSTRAINT unique_sha_config_arch UNIQUE(sha, config, architecture)
+    updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Migrate tables created with the old UNIQUE(sha, config, architecture)
+ALTER TABLE benchmark_commits ADD COLUMN IF NOT EXISTS
+    config_hash UUID GENERATED ALWAYS AS (md5(config::text)::uuid) STORED;
+ALTER TABLE benchmark_commits DROP CONSTRAINT IF EXISTS unique_sha_config_arch;
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_benchmark_metrics_unique 
     ON benchmark_metrics(timestamp, commit, command, data_size, pipeline, rps, cluster_mode, tls, io_threads, architecture);
 CREATE INDEX IF NOT EXISTS idx_benchmark_metrics_timestamp_command ON benchmark_metrics(timestamp, command);
+-- Unique: same commit + config + architecture can only exist once
+CREATE UNIQUE INDEX IF NOT EXISTS unique_sha_config_hash_arch ON benchmark_commits(sha, config_hash, architecture);
 CREATE INDEX IF NOT EXISTS idx_commits_sha_status ON benchmark_commits(sha, status);
-CREATE INDEX IF NOT EXISTS idx_commits_status ON benchmark_commits(status);
-CREATE INDEX IF NOT EXISTS idx_commits_config ON benchmark_commits USING GIN(config);
+CREATE INDEX IF NOT EXISTS idx_commits_in_progress ON benchmark_commits(id) WHERE status = 'in_progress';
+CREATE INDEX IF NOT EXISTS idx_commits_config_path ON benchmark_commits USING GIN(config jsonb_path_ops);
 
 -- Change ownership of tables and sequences to github_actions
 ALTER TABLE IF EXISTS benchmark_metrics OWNER TO github_actions;
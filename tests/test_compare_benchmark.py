@@ -195,6 +195,17 @@ class TestAverageMultipleRuns:
     def test_empty_data(self):
         assert average_multiple_runs([]) == []
 
+    def test_input_runs_not_mutated(self):
+        # main() reuses the raw runs for variance graphs after averaging
+        data = [
+            {"command": "GET", "pipeline": 1, "rps": 100000.0},
+            {"command": "GET", "pipeline": 1, "rps": 200000.0},
+            {"command": "SET", "pipeline": 1, "rps": 80000.0},
+        ]
+        snapshot = [dict(item) for item in data]
+        average_multiple_runs(data)
+        assert data == snapshot
+
     def test_different_configs_not_merged(self):
         data = [
             {
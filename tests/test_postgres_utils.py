@@ -1,22 +1,32 @@
 """Unit tests for postgres utility pure logic functions.
 
 Tests cover:
-- _is_list_subset, _is_config_subset, _is_config_array_subset from utils/postgres_track_commits.py
-- detect_field_type, analyze_metrics_schema, convert_metrics_to_rows from utils/push_to_postgres.py
+- _is_list_subset, _is_config_subset, _is_config_array_subset,
+  _first_unbenchmarked_shas, determine_commits_to_benchmark, mark_commits from
+  utils/postgres_track_commits.py (queries against a fake connection)
+- detect_field_type, analyze_metrics_schema, convert_metrics_to_rows,
+  _copy_text_value from utils/push_to_postgres.py
 """
 
 from datetime import datetime
+from pathlib import Path
 
+import pytest
 
+import utils.postgres_track_commits as track_commits
 from utils.postgres_track_commits import (
     _is_list_subset,
     _is_config_subset,
     _is_config_array_subset,
+    _first_unbenchmarked_shas,
+    determine_commits_to_benchmark,
+    mark_commits,
 )
 from utils.push_to_postgres import (
     detect_field_type,
     analyze_metrics_schema,
     convert_metrics_to_rows,
+    _copy_text_value,
 )
 
 # ---------------------------------------------------------------------------
@@ -55,6 +65,10 @@ class TestIsListSubset:
     def test_string_elements_not_subset(self):
         assert _is_list_subset(["a", "d"], ["a", "b", "c"]) is False
 
+    def test_unhashable_elements(self):
+        assert _is_list_subset([{"a": 1}], [{"a": 1}, {"b": 2}]) is True
+        assert _is_list_subset([{"a": 2}], [{"a": 1}, {"b": 2}]) is False
+
 
 # ---------------------------------------------------------------------------
 # _is_config_subset
@@ -135,6 +149,22 @@ class TestIsConfigArraySubset:
     def test_empty_subset_array(self):
         assert _is_config_array_subset([], [{"key": "value"}]) is True
 
+    def test_scalar_match_with_list_mismatch_tries_other_candidates(self):
+        subset = [{"mode": "cluster", "sizes": [512]}]
+        superset = [
+            {"mode": "cluster", "sizes": [64], "tls": False},
+            {"mode": "cluster", "sizes": [64, 512], "tls": True},
+        ]
+        assert _is_config_array_subset(subset, superset) is True
+
+    def test_subset_without_scalar_fields_checks_all_elements(self):
+        subset = [{"sizes": [128]}]
+        superset = [{"mode": "a", "sizes": [64]}, {"mode": "b", "sizes": [128]}]
+        assert _is_config_array_subset(subset, superset) is True
+
+    def test_non_dict_subset_element_not_matched(self):
+        assert _is_config_array_subset(["value"], [{"key": "value"}]) is False
+
     def test_non_list_subset_returns_false(self):
         assert _is_config_array_subset("not a list", [{"key": "value"}]) is False
 
@@ -158,15 +188,15 @@ class TestDetectFieldType:
     def test_int_returns_integer(self):
         assert detect_field_type(42) == "INTEGER"
 
-    def test_float_returns_decimal(self):
-        assert detect_field_type(3.14) == "DECIMAL(15,6)"
+    def test_float_returns_double_precision(self):
+        assert detect_field_type(3.14) == "DOUBLE PRECISION"
 
-    def test_short_string_returns_varchar50(self):
-        assert detect_field_type("GET") == "VARCHAR(50)"
+    def test_short_string_returns_text(self):
+        assert detect_field_type("GET") == "TEXT"
 
-    def test_medium_string_returns_varchar255(self):
+    def test_medium_string_returns_text(self):
         value = "a" * 100
-        assert detect_field_type(value) == "VARCHAR(255)"
+        assert detect_field_type(value) == "TEXT"
 
     def test_long_string_returns_text(self):
         value = "a" * 300
@@ -220,9 +250,34 @@ class TestAnalyzeMetricsSchema:
     def test_numeric_field_types(self):
         metrics = [{"rps": 150000.0, "pipeline": 1, "timestamp": "t", "commit": "c"}]
         schema = analyze_metrics_schema(metrics)
-        assert schema["rps"] == "DECIMAL(15,6)"
+        assert schema["rps"] == "DOUBLE PRECISION"
         assert schema["pipeline"] == "INTEGER"
 
+    def test_fields_in_first_seen_order(self):
+        metrics = [
+            {"timestamp": "t", "commit": "c", "rps": 1.0},
+            {"timestamp": "t", "commit": "c", "rps": 2.0, "avg_latency_ms": 0.5},
+        ]
+        schema = analyze_metrics_schema(metrics)
+        assert list(schema) == [
+            "id",
+            "created_at",
+            "timestamp",
+            "commit",
+            "rps",
+            "avg_latency_ms",
+        ]
+
+    def test_type_from_first_non_null_sample(self):
+        metrics = [
+            {"timestamp": "t", "commit": "c", "p99": None},
+            {"timestamp": "t", "commit": "c", "p99": 1.5, "tls": False},
+            {"timestamp": "t", "commit": "c", "p99": 7, "tls": True},
+        ]
+        schema = analyze_metrics_schema(metrics)
+        assert schema["p99"] == "DOUBLE PRECISION"
+        assert schema["tls"] == "BOOLEAN"
+
     def test_group_description_uses_varchar500(self):
         metrics = [
             {
@@ -246,8 +301,8 @@ class TestAnalyzeMetricsSchema:
         assert schema["scenario_description"] == "VARCHAR(500)"
 
     def test_long_description_still_varchar500(self):
-        # Override default VARCHAR(50)/(255)/TEXT bucketing — descriptions
-        # always get VARCHAR(500) regardless of sample length.
+        # Override default TEXT typing — descriptions always get
+        # VARCHAR(500) regardless of sample length.
         metrics = [
             {
                 "timestamp": "2024-01-01T00:00:00",
@@ -318,6 +373,16 @@ class TestConvertMetricsToRows:
         assert rows[0][0] == "SET"
         assert rows[0][1] == 100.0
 
+    def test_unhashable_timestamp_becomes_none(self):
+        metrics = [
+            {"timestamp": ["2024-01-01T00:00:00"], "commit": "abc"},
+            {"timestamp": {"at": "2024-01-01T00:00:00"}, "commit": "def"},
+        ]
+        columns = ["timestamp", "commit"]
+        rows, skipped = convert_metrics_to_rows(metrics, columns)
+        assert rows == [(None, "abc"), (None, "def")]
+        assert skipped == 0
+
     def test_timestamp_parsed_to_datetime(self):
         metrics = [{"timestamp": "2024-01-01T00:00:00", "commit": "abc"}]
         columns = ["timestamp", "commit"]
@@ -342,3 +407,210 @@ class TestConvertMetricsToRows:
         rows, _ = convert_metrics_to_rows(metrics, columns)
         assert rows[0][2] == "g" * 500
         assert rows[0][3] == "s" * 500
+
+
+# ---------------------------------------------------------------------------
+# _copy_text_value
+# ---------------------------------------------------------------------------
+
+
+class TestCopyTextValue:
+    def test_none_is_null_marker(self):
+        assert _copy_text_value(None) == "\\N"
+
+    def test_empty_string_is_not_null(self):
+        assert _copy_text_value("") == ""
+
+    def test_special_characters_escaped(self):
+        assert _copy_text_value("a\tb\nc\\d\re") == "a\\tb\\nc\\\\d\\re"
+
+    def test_non_string_values(self):
+        assert _copy_text_value(True) == "True"
+        assert _copy_text_value(42) == "42"
+        assert _copy_text_value(1.5) == "1.5"
+
+    def test_datetime_value(self):
+        ts = datetime.fromisoformat("2024-01-01T00:00:00+00:00")
+        assert _copy_text_value(ts) == "2024-01-01 00:00:00+00:00"
+
+    def test_dict_and_list_values_are_json(self):
+        assert _copy_text_value({"a": 1}) == '{"a": 1}'
+        assert _copy_text_value([1, "x\\y"]) == '[1, "x\\\\\\\\y"]'
+
+
+# ---------------------------------------------------------------------------
+# Fake connection: records executed statements and replays queued results
+# ---------------------------------------------------------------------------
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query, params))
+
+    def fetchall(self):
+        return self.conn.results.pop(0)
+
+    def copy_expert(self, query, file):
+        self.conn.copied.append((query, file.read()))
+
+
+class FakeConnection:
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.executed = []
+        self.copied = []
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+
+# ---------------------------------------------------------------------------
+# _first_unbenchmarked_shas
+# ---------------------------------------------------------------------------
+
+
+class TestFirstUnbenchmarkedShas:
+    def test_returns_rows_in_order(self):
+        conn = FakeConnection([[("c",), ("a",)]])
+        assert _first_unbenchmarked_shas(conn, ["c", "b", "a"], "x86_64", None, 5) == [
+            "c",
+            "a",
+        ]
+        query, params = conn.executed[0]
+        assert "WITH ORDINALITY" in query
+        assert "bc.config" not in query
+        assert params == [["c", "b", "a"], "x86_64", 5]
+
+    def test_filters_on_exact_config(self):
+        config = {"requests": [1000]}
+        conn = FakeConnection([[]])
+        assert _first_unbenchmarked_shas(conn, ["a"], "arm64", config, 1) == []
+        query, params = conn.executed[0]
+        assert "AND bc.config = %s" in query
+        assert params[1] == "arm64"
+        assert params[2].adapted == config
+        assert params[3] == 1
+
+    def test_no_query_without_shas_or_limit(self):
+        conn = FakeConnection()
+        assert _first_unbenchmarked_shas(conn, [], "x86_64", None, 5) == []
+        assert _first_unbenchmarked_shas(conn, ["a"], "x86_64", None, 0) == []
+        assert conn.executed == []
+
+
+# ---------------------------------------------------------------------------
+# determine_commits_to_benchmark
+# ---------------------------------------------------------------------------
+
+
+class TestDetermineCommitsToBenchmark:
+    @pytest.fixture(autouse=True)
+    def fake_repo(self, monkeypatch):
+        monkeypatch.setattr(track_commits, "ensure_schema", lambda conn: None)
+        monkeypatch.setattr(track_commits, "cleanup_incomplete_commits", lambda conn: 0)
+        monkeypatch.setattr(
+            track_commits,
+            "_git_rev_list_stream",
+            lambda repo, branch: (sha for sha in ["s1", "s2", "s3", "s4"]),
+        )
+
+    def test_exact_only_path_is_filtered_by_postgres(self):
+        conn = FakeConnection([[("s2",), ("s4",)]])
+        commits = determine_commits_to_benchmark(
+            conn,
+            Path("."),
+            "main",
+            2,
+            "x86_64",
+            {"requests": [1000]},
+            enable_subset_detection=False,
+        )
+        assert commits == ["s2", "s4"]
+        assert len(conn.executed) == 1
+        assert "WITH ORDINALITY" in conn.executed[0][0]
+
+    def test_subset_path_skips_exact_and_superset_matches(self):
+        config = {"requests": [1000], "data_sizes": [16]}
+        superset = {"requests": [1000], "data_sizes": [16, 64]}
+        conn = FakeConnection([[("s1", config, True), ("s2", superset, False)]])
+        commits = determine_commits_to_benchmark(
+            conn, Path("."), "main", 1, "x86_64", config
+        )
+        assert commits == ["s3"]
+        query, params = conn.executed[0]
+        assert "config @> %(config)s" in query
+        assert params["shas"] == ["s1", "s2", "s3", "s4"]
+        assert params["config"].adapted == config
+
+
+# ---------------------------------------------------------------------------
+# mark_commits
+# ---------------------------------------------------------------------------
+
+
+class TestMarkCommits:
+    CONFIG = {"requests": [1000], "data_sizes": [16]}
+    TIMES = {"s1": "2024-01-01T00:00:00+00:00", "s2": "2024-01-02T00:00:00+00:00"}
+
+    @pytest.fixture(autouse=True)
+    def fake_repo(self, monkeypatch):
+        monkeypatch.setattr(track_commits, "ensure_schema", lambda conn: None)
+        monkeypatch.setattr(
+            track_commits,
+            "_git_commit_times",
+            lambda repo, shas: {sha: self.TIMES[sha] for sha in shas},
+        )
+
+    def test_large_batch_copies_csv_into_staging_table(self, monkeypatch):
+        monkeypatch.setattr(track_commits, "_COPY_MIN_ROWS", 2)
+        conn = FakeConnection()
+        mark_commits(
+            conn, Path("."), ["s1", "s2", "s1"], "complete", "x86_64", self.CONFIG
+        )
+
+        copy_sql, csv_text = conn.copied[0]
+        assert "COPY benchmark_commits_stage" in copy_sql
+        assert "FORMAT csv" in copy_sql
+        assert csv_text.splitlines() == [
+            's1,complete,"{""data_sizes"":[16],""requests"":[1000]}",'
+            "2024-01-01T00:00:00+00:00,x86_64",
+            's2,complete,"{""data_sizes"":[16],""requests"":[1000]}",'
+            "2024-01-02T00:00:00+00:00,x86_64",
+        ]
+
+        upsert_sql = conn.executed[-1][0]
+        assert "INSERT INTO benchmark_commits" in upsert_sql
+        assert "FROM benchmark_commits_stage" in upsert_sql
+        assert "ON CONFLICT (sha, config_hash, architecture)" in upsert_sql
+
+    def test_small_batch_passes_same_json_text(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            track_commits,
+            "execute_values",
+            lambda cur, query, rows, **kwargs: calls.append((rows, kwargs)),
+        )
+        conn = FakeConnection()
+        mark_commits(conn, Path("."), ["s1"], "in_progress", "arm64", self.CONFIG)
+
+        rows, kwargs = calls[0]
+        assert rows == [
+            (
+                "s1",
+                "in_progress",
+                '{"data_sizes":[16],"requests":[1000]}',
+                "2024-01-01T00:00:00+00:00",
+                "arm64",
+            )
+        ]
+        assert "%s::jsonb" in kwargs["template"]
+        assert conn.copied == []
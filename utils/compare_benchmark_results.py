@@ -35,6 +35,15 @@ except ImportError:
 CONFIDENCE_LEVEL = 0.95
 CONFIDENCE_PERCENT = int(CONFIDENCE_LEVEL * 100)
 
+# Available metrics with their display names, in table and graph order
+_AVAILABLE_METRICS = [
+    ("rps", "rps"),
+    ("latency_avg_ms", "avg_latency"),
+    ("latency_p50_ms", "p50_latency"),
+    ("latency_p95_ms", "p95_latency"),
+    ("latency_p99_ms", "p99_latency"),
+]
+
 
 def load_benchmark_data(path: str) -> List[Dict[str, Any]]:
     """Load benchmark data from a JSON file."""
@@ -608,27 +617,15 @@ def create_comparison_table_data(
     baseline_configs = group_by_static_configuration(baseline_data)
     new_configs = group_by_static_configuration(new_data)
 
-    # Define available metrics with their display names
-    available_metrics = [
-        ("rps", "rps"),
-        ("latency_avg_ms", "avg_latency"),
-        ("latency_p50_ms", "p50_latency"),
-        ("latency_p95_ms", "p95_latency"),
-        ("latency_p99_ms", "p99_latency"),
-    ]
-
     # Select metrics based on filter
     if metrics_filter == "rps":
-        selected_metrics = [("rps", "rps")]
+        selected_metrics = [m for m in _AVAILABLE_METRICS if m[0] == "rps"]
     elif metrics_filter == "latency":
         selected_metrics = [
-            ("latency_avg_ms", "avg_latency"),
-            ("latency_p50_ms", "p50_latency"),
-            ("latency_p95_ms", "p95_latency"),
-            ("latency_p99_ms", "p99_latency"),
+            m for m in _AVAILABLE_METRICS if m[0].startswith("latency_")
         ]
     else:  # "all" or any other value
-        selected_metrics = available_metrics
+        selected_metrics = _AVAILABLE_METRICS
 
     # Process all unique configurations from both datasets
     all_config_signatures = sorted(
@@ -1700,14 +1697,22 @@ def generate_consolidated_metrics_graph(
                 metrics_data[metric] = []
             metrics_data[metric].append(row)
 
+        # Subplots follow the table order; rows carry the display name
+        present_metrics = [
+            display for _, display in _AVAILABLE_METRICS if display in metrics_data
+        ]
+
         # Create subplots for each metric
-        num_metrics = len(metrics_data)
+        num_metrics = len(present_metrics)
+        if num_metrics == 0:
+            return None
         _, axes = plt.subplots(num_metrics, 1, figsize=(14, 6 * num_metrics))
         if num_metrics == 1:
             axes = [axes]
 
-        for idx, (metric, metric_rows) in enumerate(sorted(metrics_data.items())):
+        for idx, metric in enumerate(present_metrics):
             ax = axes[idx]
+            metric_rows = metrics_data[metric]
 
             # Create labels and data for this metric
             labels = []
@@ -1718,32 +1723,38 @@ def generate_consolidated_metrics_graph(
             pipeline = metric_rows[0]["pipeline"] if metric_rows else "Unknown"
             io_threads = metric_rows[0]["io_threads"] if metric_rows else "Unknown"
 
+            # Convert RPS to millions, keep other metrics as-is. The metric is
+            # fixed for the whole subplot, so pick the scale and label format once.
+            if metric == "rps":
+                value_scale = 1_000_000
+                value_suffix = "M"
+            else:
+                value_scale = 1
+                value_suffix = ""
+
             for row in metric_rows:
                 label = f"{row['command']}\nP{row['pipeline']}/T{row['io_threads']}"
                 labels.append(label)
-
-                # Convert RPS to millions, keep other metrics as-is
-                if metric == "rps":
-                    baseline_values.append(row["baseline_value"] / 1_000_000)
-                    new_values.append(row["new_value"] / 1_000_000)
-                else:
-                    baseline_values.append(row["baseline_value"])
-                    new_values.append(row["new_value"])
+                baseline_values.append(row["baseline_value"] / value_scale)
+                new_values.append(row["new_value"] / value_scale)
 
             # Create the bar chart with proper legend format: "commit-P{pipeline}/IO{io_threads}"
             x = np.arange(len(labels))
             width = 0.35
 
-            bars1 = ax.bar(
-                x - width / 2,
+            x_base = x - width / 2
+            x_new = x + width / 2
+
+            ax.bar(
+                x_base,
                 baseline_values,
                 width,
                 label=f"{baseline_version}-P{pipeline}/IO{io_threads}",
                 alpha=0.8,
                 color="steelblue",
             )
-            bars2 = ax.bar(
-                x + width / 2,
+            ax.bar(
+                x_new,
                 new_values,
                 width,
                 label=f"{new_version}-P{pipeline}/IO{io_threads}",
@@ -1751,48 +1762,26 @@ def generate_consolidated_metrics_graph(
                 color="mediumseagreen",
             )
 
-            # Add value labels on bars
-            for bar in bars1:
-                height = bar.get_height()
-                if metric == "rps":
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2.0,
-                        height,
-                        f"{height:.3f}M",
-                        ha="center",
-                        va="bottom",
-                        fontsize=9,
-                    )
-                else:
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2.0,
-                        height,
-                        f"{height:.3f}",
-                        ha="center",
-                        va="bottom",
-                        fontsize=9,
-                    )
+            # Add value labels on bars; positions and heights are already known
+            for xi, height in zip(x_base, baseline_values):
+                ax.text(
+                    xi,
+                    height,
+                    f"{height:.3f}{value_suffix}",
+                    ha="center",
+                    va="bottom",
+                    fontsize=9,
+                )
 
-            for bar in bars2:
-                height = bar.get_height()
-                if metric == "rps":
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2.0,
-                        height,
-                        f"{height:.3f}M",
-                        ha="center",
-                        va="bottom",
-                        fontsize=9,
-                    )
-                else:
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2.0,
-                        height,
-                        f"{height:.3f}",
-                        ha="center",
-                        va="bottom",
-                        fontsize=9,
-                    )
+            for xi, height in zip(x_new, new_values):
+                ax.text(
+                    xi,
+                    height,
+                    f"{height:.3f}{value_suffix}",
+                    ha="center",
+                    va="bottom",
+                    fontsize=9,
+                )
 
             # Set labels and formatting
             ax.set_xlabel("Command/Configuration")
@@ -1919,13 +1908,14 @@ def main():
         print("ERROR: --new is required", file=sys.stderr)
         sys.exit(1)
 
-    # Load benchmark data
-    baseline_data = load_benchmark_data(baseline_file)
-    new_data = load_benchmark_data(new_file)
+    # Load benchmark data. The raw runs are kept for variance graphs;
+    # average_multiple_runs builds new dicts and leaves its input untouched.
+    raw_baseline_data = load_benchmark_data(baseline_file)
+    raw_new_data = load_benchmark_data(new_file)
 
     # Always apply dynamic averaging for consistent comparisons
-    baseline_data = average_multiple_runs(baseline_data)
-    new_data = average_multiple_runs(new_data)
+    baseline_data = average_multiple_runs(raw_baseline_data)
+    new_data = average_multiple_runs(raw_new_data)
 
     # Generate comparison data
     config_groups, baseline_version, new_version, baseline_repo, new_repo = (
@@ -1934,10 +1924,6 @@ def main():
 
     # Generate graphs if requested
     if generate_graphs:
-        # Load raw data again for variance analysis
-        raw_baseline_data = load_benchmark_data(baseline_file)
-        raw_new_data = load_benchmark_data(new_file)
-
         generated_files = generate_comparison_graphs(
             config_groups,
             baseline_version,
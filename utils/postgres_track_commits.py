@@ -2,41 +2,91 @@
 """PostgreSQL-based commit tracking for benchmarks."""
 
 import argparse
+import csv
+import functools
+import io
 import json
 import platform
 import subprocess
 import sys
+from collections import defaultdict
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+
+# Connection DSNs whose tracking schema was created/verified in this process
+_SCHEMA_READY: Set[str] = set()
+
+# Rows fetched per round-trip by the server-side cursors used for queries
+_CURSOR_ITERSIZE = 2000
+
+# Commits read from git rev-list and checked against the database per query
+_REV_LIST_BATCH_SIZE = 500
+
+# mark_commits switches from execute_values to COPY at this many rows
+_COPY_MIN_ROWS = 500
 
 
 def create_tables(conn):
-    """Create benchmark tracking tables if they don't exist."""
+    """Create benchmark tracking tables if they don't exist.
+
+    The table statements, whose ALTERs take ACCESS EXCLUSIVE locks, only run
+    when the table is missing or still lacks config_hash. The index
+    statements are no-ops once applied and always run, so index changes
+    reach databases that were migrated earlier.
+    """
     with conn.cursor() as cur:
         cur.execute(
             """
-            CREATE TABLE IF NOT EXISTS benchmark_commits (
-                id SERIAL PRIMARY KEY,
-                sha VARCHAR(40) NOT NULL,
-                timestamp TIMESTAMPTZ NOT NULL,
-                status VARCHAR(20) NOT NULL CHECK (status IN ('in_progress', 'complete')),
-                config JSONB NOT NULL,
-                architecture VARCHAR(50),
-                created_at TIMESTAMPTZ DEFAULT NOW(),
-                updated_at TIMESTAMPTZ DEFAULT NOW(),
-                
-                -- Unique constraint: same commit + config + architecture can only exist once
-                CONSTRAINT unique_sha_config_arch UNIQUE(sha, config, architecture)
-            );
-            
-            -- Indexes for fast lookups
-            CREATE INDEX IF NOT EXISTS idx_commits_sha ON benchmark_commits(sha);
-            CREATE INDEX IF NOT EXISTS idx_commits_status ON benchmark_commits(status);
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+                AND table_name = 'benchmark_commits'
+                AND column_name = 'config_hash'
+        """
+        )
+        if cur.fetchone() is None:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS benchmark_commits (
+                    id SERIAL PRIMARY KEY,
+                    sha VARCHAR(40) NOT NULL,
+                    timestamp TIMESTAMPTZ NOT NULL,
+                    status VARCHAR(20) NOT NULL CHECK (status IN ('in_progress', 'complete')),
+                    config JSONB NOT NULL,
+                    -- Fixed-size key for the config; jsonb text output is canonical
+                    config_hash UUID GENERATED ALWAYS AS (md5(config::text)::uuid) STORED,
+                    architecture VARCHAR(50),
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
+                );
+
+                -- Migrate tables created with the old UNIQUE(sha, config, architecture)
+                ALTER TABLE benchmark_commits ADD COLUMN IF NOT EXISTS
+                    config_hash UUID GENERATED ALWAYS AS (md5(config::text)::uuid) STORED;
+                ALTER TABLE benchmark_commits DROP CONSTRAINT IF EXISTS unique_sha_config_arch;
+            """
+            )
+
+        cur.execute(
+            """
+            -- Unique: same commit + config + architecture can only exist once
+            CREATE UNIQUE INDEX IF NOT EXISTS unique_sha_config_hash_arch
+                ON benchmark_commits(sha, config_hash, architecture);
+
+            -- Indexes for fast lookups; sha alone is served by idx_commits_sha_status
+            DROP INDEX IF EXISTS idx_commits_sha;
+            -- Cleanup only ever looks for in-progress rows; a partial index stays tiny
+            DROP INDEX IF EXISTS idx_commits_status;
+            CREATE INDEX IF NOT EXISTS idx_commits_in_progress ON benchmark_commits(id)
+                WHERE status = 'in_progress';
             CREATE INDEX IF NOT EXISTS idx_commits_timestamp ON benchmark_commits(timestamp);
-            CREATE INDEX IF NOT EXISTS idx_commits_config ON benchmark_commits USING GIN(config);
+            -- jsonb_path_ops only serves @>, but is much smaller than the default
+            DROP INDEX IF EXISTS idx_commits_config;
+            CREATE INDEX IF NOT EXISTS idx_commits_config_path ON benchmark_commits USING GIN(config jsonb_path_ops);
             CREATE INDEX IF NOT EXISTS idx_commits_sha_status ON benchmark_commits(sha, status);
         """
         )
@@ -44,28 +94,146 @@ def create_tables(conn):
     print("Created/verified benchmark_commits table", file=sys.stderr)
 
 
-def _git_rev_list(repo: Path, branch: str) -> List[str]:
-    """Get list of commit SHAs from git."""
-    proc = subprocess.run(
+def ensure_schema(conn):
+    """Create the tracking tables once per database, skipping repeat DDL."""
+    if conn.dsn in _SCHEMA_READY:
+        return
+    create_tables(conn)
+    _SCHEMA_READY.add(conn.dsn)
+
+
+def _canonical_config(config):
+    """Return config with object keys sorted at every level.
+
+    Configs enter the module from files and from JSONB, whose key orders
+    differ; normalizing once keeps serialization and comparisons stable.
+    """
+    if config is None:
+        return None
+    return json.loads(json.dumps(config, sort_keys=True))
+
+
+def _dumps_compact(obj) -> str:
+    """Serialize to JSON without the whitespace json.dumps adds by default."""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _config_param(config) -> Json:
+    """Wrap a config for use as a JSONB query parameter.
+
+    Configs are already canonicalized, so no key sorting is needed here;
+    compact separators keep the text sent to PostgreSQL minimal.
+    """
+    return Json(config, dumps=_dumps_compact)
+
+
+def _git_rev_list_stream(repo: Path, branch: str) -> Iterator[str]:
+    """Yield commit SHAs from git, newest first.
+
+    git is terminated as soon as the caller stops iterating (or closes the
+    generator), so only the part of the history actually inspected is walked.
+    """
+    proc = subprocess.Popen(
         ["git", "rev-list", branch],
         cwd=repo,
-        capture_output=True,
+        stdout=subprocess.PIPE,
         text=True,
-        check=True,
     )
-    return proc.stdout.strip().splitlines()
+    exhausted = False
+    try:
+        for line in proc.stdout:
+            yield line.rstrip("\n")
+        exhausted = True
+    finally:
+        if not exhausted and proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_architecture() -> str:
+    """Return the machine architecture of the current host."""
+    return platform.machine()
+
+
+def _resolve_head(repo: Path) -> str:
+    """Return the commit SHA that HEAD points to in repo."""
+    return subprocess.check_output(
+        ["git", "rev-parse", "HEAD"], cwd=repo, text=True
+    ).strip()
 
 
-def _git_commit_time(repo: Path, sha: str) -> str:
-    """Get commit timestamp."""
+def _git_commit_times(repo: Path, shas: List[str]) -> Dict[str, str]:
+    """Get commit timestamps for several SHAs with two git calls in total.
+
+    The SHAs are first resolved to full commit ids so the ``git log`` output,
+    which git de-duplicates per commit, can be mapped back to every input.
+    """
+    if not shas:
+        return {}
+
+    resolved = subprocess.run(
+        ["git", "rev-parse", *(f"{sha}^{{commit}}" for sha in shas)],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
     proc = subprocess.run(
-        ["git", "show", "-s", "--format=%cI", sha],
+        ["git", "log", "--no-walk=unsorted", "--format=%H %cI", *resolved],
         cwd=repo,
         capture_output=True,
         text=True,
         check=True,
     )
-    return proc.stdout.strip()
+    times = dict(line.split(" ", 1) for line in proc.stdout.splitlines() if line)
+    return {sha: times[full_sha] for sha, full_sha in zip(shas, resolved)}
+
+
+def _bulk_mark_via_copy(cur, rows: List[Tuple]) -> None:
+    """Upsert many commit rows by COPYing them into a staging table.
+
+    Args:
+        cur: Cursor on the connection to write through
+        rows: (sha, status, config_json_text, timestamp, architecture) tuples
+    """
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+
+    cur.execute(
+        """
+        CREATE TEMP TABLE benchmark_commits_stage (
+            sha VARCHAR(40),
+            status VARCHAR(20),
+            config JSONB,
+            timestamp TIMESTAMPTZ,
+            architecture VARCHAR(50)
+        )
+    """
+    )
+    cur.copy_expert(
+        "COPY benchmark_commits_stage (sha, status, config, timestamp, architecture)"
+        " FROM STDIN WITH (FORMAT csv)",
+        buf,
+    )
+    cur.execute(
+        """
+        INSERT INTO benchmark_commits (sha, status, config, timestamp, architecture)
+        SELECT sha, status, config, timestamp, architecture
+        FROM benchmark_commits_stage
+        ON CONFLICT (sha, config_hash, architecture)
+        DO UPDATE SET
+            status = EXCLUDED.status,
+            updated_at = NOW();
+        DROP TABLE benchmark_commits_stage;
+    """
+    )
 
 
 def mark_commits(
@@ -78,6 +246,8 @@ def mark_commits(
 ) -> None:
     """Mark commits with status, architecture, and config.
 
+    The caller owns the transaction and must commit.
+
     Args:
         conn: PostgreSQL connection
         repo: Path to git repository
@@ -87,54 +257,69 @@ def mark_commits(
         config: Config content (dict/list) to track
     """
     # Ensure tables exist
-    create_tables(conn)
+    ensure_schema(conn)
+    config = _canonical_config(config)
+
+    # Resolve HEAD to actual commit SHA once, however often it is passed
+    head = _resolve_head(repo) if "HEAD" in shas else None
+    resolved_shas = [head if sha == "HEAD" else sha for sha in shas]
+
+    # A single upsert statement cannot touch the same row twice
+    unique_shas = list(dict.fromkeys(resolved_shas))
+    commit_times = _git_commit_times(repo, unique_shas)
+
+    # Both write paths take the config as the same JSON text
+    config_json = _dumps_compact(config if config else {})
+    rows = [
+        (sha, status, config_json, commit_times[sha], architecture)
+        for sha in unique_shas
+    ]
+
+    # Format config for display
+    config_display = ""
+    if config:
+        if isinstance(config, list) and len(config) > 0:
+            first_cfg = config[0]
+            config_display = f" (config: io-threads={first_cfg.get('io-threads', 'N/A')}, cluster={first_cfg.get('cluster_mode', 'N/A')})"
 
     with conn.cursor() as cur:
-        for sha in shas:
-            # Resolve HEAD to actual commit SHA
-            if sha == "HEAD":
-                sha = subprocess.check_output(
-                    ["git", "rev-parse", "HEAD"], cwd=repo, text=True
-                ).strip()
-
-            ts = _git_commit_time(repo, sha)
-
-            # Insert or update
-            cur.execute(
+        # Large batches (e.g. history backfills) go through COPY
+        if len(rows) >= _COPY_MIN_ROWS:
+            _bulk_mark_via_copy(cur, rows)
+        else:
+            # Insert or update all commits in one round-trip
+            execute_values(
+                cur,
                 """
                 INSERT INTO benchmark_commits (sha, status, config, timestamp, architecture)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (sha, config, architecture) 
-                DO UPDATE SET 
+                VALUES %s
+                ON CONFLICT (sha, config_hash, architecture)
+                DO UPDATE SET
                     status = EXCLUDED.status,
                     updated_at = NOW()
             """,
-                (sha, status, Json(config) if config else Json({}), ts, architecture),
+                rows,
+                template="(%s, %s, %s::jsonb, %s, %s)",
+                page_size=1000,
             )
 
-            # Format config for display
-            config_display = ""
-            if config:
-                if isinstance(config, list) and len(config) > 0:
-                    first_cfg = config[0]
-                    config_display = f" (config: io-threads={first_cfg.get('io-threads', 'N/A')}, cluster={first_cfg.get('cluster_mode', 'N/A')})"
-
-            print(
-                f"Marked {sha} (on {architecture}) as {status} with timestamp {ts}{config_display}",
-                file=sys.stderr,
-            )
-
-    conn.commit()
+    for sha, _, _, ts, _ in rows:
+        print(
+            f"Marked {sha} (on {architecture}) as {status} with timestamp {ts}{config_display}",
+            file=sys.stderr,
+        )
 
 
 def cleanup_incomplete_commits(conn) -> int:
     """Remove all 'in_progress' entries.
 
+    The caller owns the transaction and must commit.
+
     Returns:
         Number of entries cleaned up
     """
     # Ensure tables exist
-    create_tables(conn)
+    ensure_schema(conn)
 
     with conn.cursor() as cur:
         cur.execute(
@@ -146,8 +331,6 @@ def cleanup_incomplete_commits(conn) -> int:
         )
         count = cur.rowcount
 
-    conn.commit()
-
     if count > 0:
         print(f"Cleaned up {count} incomplete commits", file=sys.stderr)
 
@@ -158,7 +341,41 @@ def _is_list_subset(subset_list: List, superset_list: List) -> bool:
     """Check if all elements in subset_list exist in superset_list."""
     if not isinstance(subset_list, list) or not isinstance(superset_list, list):
         return False
-    return all(item in superset_list for item in subset_list)
+    try:
+        return set(subset_list).issubset(superset_list)
+    except TypeError:
+        # Unhashable items (e.g. nested dicts) fall back to linear scans
+        return all(item in superset_list for item in subset_list)
+
+
+def _split_config(config: dict) -> Tuple[dict, dict]:
+    """Split a config into its non-list fields and its list fields."""
+    scalars = {}
+    lists = {}
+    for key, value in config.items():
+        if isinstance(value, list):
+            lists[key] = value
+        else:
+            scalars[key] = value
+    return scalars, lists
+
+
+def _is_split_config_subset(
+    subset_split: Tuple[dict, dict], superset_split: Tuple[dict, dict]
+) -> bool:
+    """Subset check on configs already split by _split_config."""
+    subset_scalars, subset_lists = subset_split
+    superset_scalars, superset_lists = superset_split
+
+    # Non-list values must match exactly, and a list may not stand in for one
+    if not subset_scalars.items() <= superset_scalars.items():
+        return False
+
+    # List fields in subset must be subsets of the corresponding superset lists
+    return all(
+        key in superset_lists and _is_list_subset(value, superset_lists[key])
+        for key, value in subset_lists.items()
+    )
 
 
 def _is_config_subset(subset_config: dict, superset_config: dict) -> bool:
@@ -178,22 +395,9 @@ def _is_config_subset(subset_config: dict, superset_config: dict) -> bool:
     if not isinstance(subset_config, dict) or not isinstance(superset_config, dict):
         return False
 
-    # Check each field in subset_config
-    for key, subset_value in subset_config.items():
-        if key not in superset_config:
-            return False
-
-        superset_value = superset_config[key]
-
-        # If both are lists, check if subset is contained in superset
-        if isinstance(subset_value, list) and isinstance(superset_value, list):
-            if not _is_list_subset(subset_value, superset_value):
-                return False
-        # For non-list values, they must match exactly
-        elif subset_value != superset_value:
-            return False
-
-    return True
+    return _is_split_config_subset(
+        _split_config(subset_config), _split_config(superset_config)
+    )
 
 
 def _is_config_array_subset(
@@ -214,56 +418,170 @@ def _is_config_array_subset(
     if not isinstance(subset_config, list) or not isinstance(superset_config, list):
         return False
 
+    # Split every superset config once, and index them by their scalar fields
+    # so each subset config is only compared against configs that share all
+    # of its scalar values
+    superset_splits = [
+        _split_config(cfg) if isinstance(cfg, dict) else None for cfg in superset_config
+    ]
+    scalar_index = defaultdict(set)
+    for position, split in enumerate(superset_splits):
+        if split is not None:
+            for key, value in split[0].items():
+                if not isinstance(value, dict):
+                    scalar_index[(key, value)].add(position)
+
     # Each config in subset must have a superset match
     for subset_cfg in subset_config:
-        found_superset = False
-        for superset_cfg in superset_config:
-            if _is_config_subset(subset_cfg, superset_cfg):
-                found_superset = True
+        if not isinstance(subset_cfg, dict):
+            return False
+        subset_split = _split_config(subset_cfg)
+
+        candidates = None
+        for key, value in subset_split[0].items():
+            if isinstance(value, dict):
+                continue
+            matches = scalar_index.get((key, value), set())
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
                 break
 
-        if not found_superset:
+        # No scalar fields to narrow on: fall back to checking every config
+        positions = range(len(superset_config)) if candidates is None else candidates
+        if not any(
+            superset_splits[position] is not None
+            and _is_split_config_subset(subset_split, superset_splits[position])
+            for position in sorted(positions)
+        ):
             return False
 
     return True
 
 
 def _find_superset_configs(
-    conn, sha: str, target_config: dict, architecture: str
+    completed_configs: List[dict], target_config: dict
 ) -> List[dict]:
-    """Find completed configs for a commit that are supersets of target_config.
+    """Find completed configs that are supersets of target_config.
 
     Args:
-        conn: PostgreSQL connection
-        sha: Commit SHA to check
+        completed_configs: Configs already completed for a commit
         target_config: Config to find supersets for
-        architecture: Architecture to filter by
 
     Returns:
         List of superset configs found
     """
+    superset_configs = []
+    target_split = (
+        _split_config(target_config) if isinstance(target_config, dict) else None
+    )
+
+    for completed_config in completed_configs:
+        # Handle both single config objects and config arrays
+        if isinstance(target_config, list) and isinstance(completed_config, list):
+            if _is_config_array_subset(target_config, completed_config):
+                superset_configs.append(completed_config)
+        elif target_split is not None and isinstance(completed_config, dict):
+            if _is_split_config_subset(target_split, _split_config(completed_config)):
+                superset_configs.append(completed_config)
+
+    return superset_configs
+
+
+def _completed_configs_by_sha(
+    conn, shas: List[str], architecture: str, target_config: dict
+) -> Tuple[Dict[str, List[dict]], Set[str]]:
+    """Fetch completed configs for many commits in a single query.
+
+    Only rows whose config contains target_config (``config @> target``) are
+    returned, and the exact-match test is evaluated by PostgreSQL alongside. Exact matches and any subset match found by the
+    Python helpers are always JSONB containment, so the GIN index can discard
+    non-candidates before they are shipped; the helpers still make the final
+    subset decision.
+
+    Args:
+        conn: PostgreSQL connection
+        shas: Commit SHAs to look up
+        architecture: Architecture to filter by
+        target_config: Config the completed rows must contain
+
+    Returns:
+        Tuple of (mapping of SHA to the configs completed for it, set of SHAs
+        completed with exactly target_config)
+    """
+    completed = defaultdict(list)
+    exact_shas = set()
+    if not shas:
+        return completed, exact_shas
+
     with conn.cursor() as cur:
+        # Named parameters adapt (serialize) the config once per query
         cur.execute(
             """
-            SELECT config FROM benchmark_commits
-            WHERE sha = %s AND status = 'complete' AND architecture = %s
+            SELECT sha, config, config = %(config)s FROM benchmark_commits
+            WHERE status = 'complete' AND architecture = %(architecture)s
+                AND sha = ANY(%(shas)s) AND config @> %(config)s
         """,
-            (sha, architecture),
+            {
+                "config": _config_param(target_config),
+                "architecture": architecture,
+                "shas": shas,
+            },
         )
+        for sha, config, is_exact in cur.fetchall():
+            completed[sha].append(config)
+            if is_exact:
+                exact_shas.add(sha)
+
+    return completed, exact_shas
+
+
+def _first_unbenchmarked_shas(
+    conn,
+    shas: List[str],
+    architecture: str,
+    target_config: Optional[dict],
+    limit: int,
+) -> List[str]:
+    """Return the first SHAs, in order, not completed with target_config.
+
+    Used when only exact matches matter, so PostgreSQL can do the whole
+    filter and stop after limit rows.
+
+    Args:
+        conn: PostgreSQL connection
+        shas: Commit SHAs in the order they should be considered
+        architecture: Architecture to filter by
+        target_config: Config that counts as done (None means any config)
+        limit: Maximum number of SHAs to return
 
-        completed_configs = [row[0] for row in cur.fetchall()]
-        superset_configs = []
+    Returns:
+        Up to limit SHAs from shas with no matching completed entry
+    """
+    if not shas or limit <= 0:
+        return []
 
-        for completed_config in completed_configs:
-            # Handle both single config objects and config arrays
-            if isinstance(target_config, list) and isinstance(completed_config, list):
-                if _is_config_array_subset(target_config, completed_config):
-                    superset_configs.append(completed_config)
-            elif isinstance(target_config, dict) and isinstance(completed_config, dict):
-                if _is_config_subset(target_config, completed_config):
-                    superset_configs.append(completed_config)
+    config_filter = ""
+    params = [architecture]
+    if target_config:
+        config_filter = "AND bc.config = %s"
+        params.append(_config_param(target_config))
 
-        return superset_configs
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT s.sha
+            FROM unnest(%s::text[]) WITH ORDINALITY AS s(sha, ord)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM benchmark_commits bc
+                WHERE bc.sha = s.sha AND bc.status = 'complete'
+                    AND bc.architecture = %s {config_filter}
+            )
+            ORDER BY s.ord
+            LIMIT %s
+        """,
+            [shas, *params, limit],
+        )
+        return [row[0] for row in cur.fetchall()]
 
 
 def determine_commits_to_benchmark(
@@ -277,6 +595,9 @@ def determine_commits_to_benchmark(
 ) -> List[str]:
     """Return up to max_commits SHAs not benchmarked with the given config and architecture.
 
+    Incomplete entries are cleaned up first; the caller owns the transaction
+    and must commit.
+
     Args:
         conn: PostgreSQL connection
         repo: Path to git repository
@@ -290,76 +611,82 @@ def determine_commits_to_benchmark(
         List of commit SHAs that need benchmarking
     """
     # Ensure tables exist
-    create_tables(conn)
+    ensure_schema(conn)
+    config = _canonical_config(config)
 
     # Clean up incomplete commits first
     cleanup_incomplete_commits(conn)
 
-    # Get all commits from git
-    all_shas = _git_rev_list(repo, branch)
-
-    # Get completed commits for exact config match
-    with conn.cursor() as cur:
-        if config:
-            cur.execute(
-                """
-                SELECT DISTINCT sha FROM benchmark_commits
-                WHERE status = 'complete' AND config = %s AND architecture = %s
-            """,
-                (Json(config), architecture),
-            )
-        else:
-            cur.execute(
-                """
-                SELECT DISTINCT sha FROM benchmark_commits
-                WHERE status = 'complete' AND architecture = %s
-            """,
-                (architecture,),
-            )
-
-        exact_completed = {row[0] for row in cur.fetchall()}
-
-    # Find commits that need benchmarking
+    # Find commits that need benchmarking, reading git history in batches so
+    # the walk stops once enough commits have been found
     commits = []
     subset_skipped = 0
+    found_enough = False
+
+    revs = _git_rev_list_stream(repo, branch)
+    try:
+        while not found_enough:
+            batch = list(islice(revs, _REV_LIST_BATCH_SIZE))
+            if not batch:
+                break
 
-    for sha in all_shas:
-        # Skip if exact config match exists
-        if sha in exact_completed:
-            continue
-
-        # Check for subset detection if enabled and config is provided
-        if enable_subset_detection and config:
-            superset_configs = _find_superset_configs(conn, sha, config, architecture)
-            if superset_configs:
-                subset_skipped += 1
-                # Format superset info for display
-                superset_info = ""
-                if (
-                    isinstance(config, list)
-                    and len(config) > 0
-                    and len(superset_configs) > 0
-                ):
-                    subset_cfg = config[0]
-                    superset_cfg = superset_configs[0]
-                    if isinstance(superset_cfg, list) and len(superset_cfg) > 0:
-                        superset_cfg = superset_cfg[0]
-
-                    subset_data_sizes = subset_cfg.get("data_sizes", [])
-                    superset_data_sizes = superset_cfg.get("data_sizes", [])
-
-                    if subset_data_sizes and superset_data_sizes:
-                        superset_info = f" (subset {subset_data_sizes} found in superset {superset_data_sizes})"
-
-                print(
-                    f"Skipping {sha[:8]} - subset config already benchmarked{superset_info}",
-                    file=sys.stderr,
+            # Without subset detection only exact matches matter, which
+            # PostgreSQL can filter and limit on its own
+            if not (enable_subset_detection and config):
+                commits.extend(
+                    _first_unbenchmarked_shas(
+                        conn, batch, architecture, config, max_commits - len(commits)
+                    )
                 )
+                found_enough = len(commits) >= max_commits
                 continue
 
-        commits.append(sha)
-        if len(commits) >= max_commits:
-            break
+            # One query serves both the exact-match and subset checks
+            completed_by_sha, exact_completed = _completed_configs_by_sha(
+                conn, batch, architecture, config
+            )
+
+            for sha in batch:
+                # Skip if exact config match exists
+                if sha in exact_completed:
+                    continue
+
+                completed_configs = completed_by_sha.get(sha, [])
+
+                # Skip commits whose config is a subset of one already completed
+                superset_configs = _find_superset_configs(completed_configs, config)
+                if superset_configs:
+                    subset_skipped += 1
+                    # Format superset info for display
+                    superset_info = ""
+                    if (
+                        isinstance(config, list)
+                        and len(config) > 0
+                        and len(superset_configs) > 0
+                    ):
+                        subset_cfg = config[0]
+                        superset_cfg = superset_configs[0]
+                        if isinstance(superset_cfg, list) and len(superset_cfg) > 0:
+                            superset_cfg = superset_cfg[0]
+
+                        subset_data_sizes = subset_cfg.get("data_sizes", [])
+                        superset_data_sizes = superset_cfg.get("data_sizes", [])
+
+                        if subset_data_sizes and superset_data_sizes:
+                            superset_info = f" (subset {subset_data_sizes} found in superset {superset_data_sizes})"
+
+                    print(
+                        f"Skipping {sha[:8]} - subset config already benchmarked{superset_info}",
+                        file=sys.stderr,
+                    )
+                    continue
+
+                commits.append(sha)
+                if len(commits) >= max_commits:
+                    found_enough = True
+                    break
+    finally:
+        revs.close()
 
     if subset_skipped > 0:
         print(
@@ -370,32 +697,40 @@ def determine_commits_to_benchmark(
     return commits
 
 
-def get_commits_by_config(
+def iter_commits_by_config(
     conn, architecture: str, config: Optional[dict] = None
-) -> List[Dict]:
-    """Get commits filtered by architecture and config.
+) -> Iterator[Dict]:
+    """Stream commits filtered by architecture and config.
+
+    Rows are read through a server-side cursor in batches of
+    _CURSOR_ITERSIZE, so large histories are never buffered in full.
 
     Args:
         conn: PostgreSQL connection
         architecture: Architecture to filter by
         config: Config to filter by (None returns all for the architecture)
 
-    Returns:
-        List of commit entries
+    Yields:
+        Commit entries, newest first
     """
     # Ensure tables exist
-    create_tables(conn)
+    ensure_schema(conn)
+    config = _canonical_config(config)
 
-    with conn.cursor() as cur:
+    with conn.cursor(name="commits_by_config") as cur:
+        cur.itersize = _CURSOR_ITERSIZE
         if config:
+            # Equality alone cannot use the jsonb_path_ops GIN index; the
+            # containment predicate lets it narrow the rows first
             cur.execute(
                 """
                 SELECT sha, timestamp, status, config, architecture
                 FROM benchmark_commits
-                WHERE config = %s AND architecture = %s
+                WHERE config @> %(config)s AND config = %(config)s
+                    AND architecture = %(architecture)s
                 ORDER BY timestamp DESC
             """,
-                (Json(config), architecture),
+                {"config": _config_param(config), "architecture": architecture},
             )
         else:
             cur.execute(
@@ -408,19 +743,68 @@ def get_commits_by_config(
                 (architecture,),
             )
 
-        results = []
-        for row in cur.fetchall():
-            results.append(
-                {
-                    "sha": row[0],
-                    "timestamp": row[1].isoformat(),
-                    "status": row[2],
-                    "config": row[3],
-                    "architecture": row[4],
-                }
-            )
+        for row in cur:
+            yield {
+                "sha": row[0],
+                "timestamp": row[1].isoformat(),
+                "status": row[2],
+                "config": row[3],
+                "architecture": row[4],
+            }
+
+
+def get_commits_by_config(
+    conn, architecture: str, config: Optional[dict] = None
+) -> List[Dict]:
+    """Get commits filtered by architecture and config.
+
+    Args:
+        conn: PostgreSQL connection
+        architecture: Architecture to filter by
+        config: Config to filter by (None returns all for the architecture)
+
+    Returns:
+        List of commit entries
+    """
+    return list(iter_commits_by_config(conn, architecture, config))
 
-        return results
+
+def count_commits_by_config(
+    conn, architecture: str, config: Optional[dict] = None
+) -> int:
+    """Count commits filtered by architecture and config in one aggregate.
+
+    Args:
+        conn: PostgreSQL connection
+        architecture: Architecture to filter by
+        config: Config to filter by (None counts all for the architecture)
+
+    Returns:
+        Number of matching commit entries
+    """
+    # Ensure tables exist
+    ensure_schema(conn)
+    config = _canonical_config(config)
+
+    with conn.cursor() as cur:
+        if config:
+            cur.execute(
+                """
+                SELECT COUNT(*) FROM benchmark_commits
+                WHERE config @> %(config)s AND config = %(config)s
+                    AND architecture = %(architecture)s
+            """,
+                {"config": _config_param(config), "architecture": architecture},
+            )
+        else:
+            cur.execute(
+                """
+                SELECT COUNT(*) FROM benchmark_commits
+                WHERE architecture = %s
+            """,
+                (architecture,),
+            )
+        return cur.fetchone()[0]
 
 
 def get_unique_configs(conn) -> List[dict]:
@@ -433,120 +817,145 @@ def get_unique_configs(conn) -> List[dict]:
         List of unique configs
     """
     # Ensure tables exist
-    create_tables(conn)
+    ensure_schema(conn)
 
-    with conn.cursor() as cur:
+    with conn.cursor(name="unique_configs") as cur:
+        cur.itersize = _CURSOR_ITERSIZE
+        # Dedupe on the fixed-size hash and fetch one config per group by
+        # primary key, rather than sorting/hashing every JSONB value
         cur.execute(
             """
-            SELECT DISTINCT config
+            SELECT config
             FROM benchmark_commits
+            WHERE id IN (
+                SELECT min(id) FROM benchmark_commits GROUP BY config_hash
+            )
         """
         )
-        return [row[0] for row in cur.fetchall()]
+        return [row[0] for row in cur]
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="PostgreSQL-based commit tracking for benchmarks"
-    )
+def get_connection(args: argparse.Namespace):
+    """Open a connection using the CLI database arguments.
+
+    Library callers running several operations should open one connection
+    with this and pass it to each function, committing between operations,
+    rather than reconnecting per operation; every connect pays a full TLS
+    handshake and authentication round-trip.
+
+    Args:
+        args: Parsed arguments with host, port, database, username, password
 
-    parser.add_argument(
-        "operation",
-        choices=["determine", "mark", "query", "cleanup"],
-        help="Operation to perform",
+    Returns:
+        PostgreSQL connection
+    """
+    return psycopg2.connect(
+        host=args.host,
+        port=args.port,
+        database=args.database,
+        user=args.username,
+        password=args.password,
+        connect_timeout=30,
+        sslmode="require",
     )
 
+
+def main():
+    # Options shared by every operation; attached to each subcommand so they
+    # can follow the operation name on the command line
+    common = argparse.ArgumentParser(add_help=False)
+
     # Database connection arguments
-    parser.add_argument("--host", required=True, help="PostgreSQL host")
-    parser.add_argument("--port", type=int, default=5432, help="PostgreSQL port")
-    parser.add_argument("--database", required=True, help="Database name")
-    parser.add_argument("--username", required=True, help="Database username")
-    parser.add_argument(
+    common.add_argument("--host", required=True, help="PostgreSQL host")
+    common.add_argument("--port", type=int, default=5432, help="PostgreSQL port")
+    common.add_argument("--database", required=True, help="Database name")
+    common.add_argument("--username", required=True, help="Database username")
+    common.add_argument(
         "--password", required=True, help="Database password (or use IAM auth)"
     )
+    common.add_argument(
+        "--architecture",
+        type=str,
+        help="Architecture (e.g., x86_64, arm64). Auto-detected if not provided.",
+    )
+
+    parser = argparse.ArgumentParser(
+        description="PostgreSQL-based commit tracking for benchmarks"
+    )
+    operations = parser.add_subparsers(
+        dest="operation", required=True, help="Operation to perform"
+    )
 
     # Arguments for determine operation
-    parser.add_argument(
-        "--repo", type=Path, help="Git repository path (for determine/mark)"
+    determine = operations.add_parser(
+        "determine", parents=[common], help="List commits that need benchmarking"
     )
-    parser.add_argument(
-        "--branch", default="unstable", help="Git branch (for determine)"
+    determine.add_argument(
+        "--repo", type=Path, required=True, help="Git repository path"
     )
-    parser.add_argument(
-        "--max-commits",
-        type=int,
-        default=3,
-        help="Max commits to return (for determine)",
+    determine.add_argument("--branch", default="unstable", help="Git branch")
+    determine.add_argument(
+        "--max-commits", type=int, default=3, help="Max commits to return"
     )
-    parser.add_argument("--config-file", type=str, help="Config file to load")
-    parser.add_argument(
+    determine.add_argument("--config-file", type=str, help="Config file to load")
+    determine.add_argument(
         "--disable-subset-detection",
         action="store_true",
-        help="Disable subset config detection (for determine)",
-    )
-    parser.add_argument(
-        "--architecture",
-        type=str,
-        help="Architecture (e.g., x86_64, arm64). Auto-detected if not provided.",
+        help="Disable subset config detection",
     )
 
     # Arguments for mark operation
-    parser.add_argument(
-        "--status", choices=["in_progress", "complete"], help="Status to set (for mark)"
+    mark = operations.add_parser(
+        "mark", parents=[common], help="Set the status of commits"
     )
+    mark.add_argument("--repo", type=Path, required=True, help="Git repository path")
+    mark.add_argument(
+        "--status",
+        choices=["in_progress", "complete"],
+        required=True,
+        help="Status to set",
+    )
+    mark.add_argument("--config-file", type=str, help="Config file to load")
+    mark.add_argument("shas", nargs="+", help="Commit SHAs")
 
     # Arguments for query operation
-    parser.add_argument(
-        "--list-configs",
-        action="store_true",
-        help="List all unique configs (for query)",
+    query = operations.add_parser(
+        "query", parents=[common], help="Count tracked commits or list configs"
+    )
+    query.add_argument("--config-file", type=str, help="Config file to load")
+    query.add_argument(
+        "--list-configs", action="store_true", help="List all unique configs"
     )
 
-    # Parse known args first to get the operation
-    args, remaining_args = parser.parse_known_args()
+    operations.add_parser(
+        "cleanup", parents=[common], help="Remove in-progress entries"
+    )
 
-    # Add shas argument only for mark operation
-    if args.operation == "mark":
-        parser.add_argument("shas", nargs="+", help="Commit SHAs (required for mark)")
-        args = parser.parse_args()
-    elif remaining_args:
-        # If there are remaining args for non-mark operations, it's an error
-        parser.error(f"unrecognized arguments: {' '.join(remaining_args)}")
+    args = parser.parse_args()
 
     # Auto-detect architecture if not provided
     if not args.architecture:
-        args.architecture = platform.machine()
+        args.architecture = _detect_architecture()
         print(f"Auto-detected architecture: {args.architecture}", file=sys.stderr)
 
     # Connect to PostgreSQL
     try:
-        conn = psycopg2.connect(
-            host=args.host,
-            port=args.port,
-            database=args.database,
-            user=args.username,
-            password=args.password,
-            connect_timeout=30,
-            sslmode="require",
-        )
+        conn = get_connection(args)
         print(f"Connected to PostgreSQL at {args.host}:{args.port}", file=sys.stderr)
     except Exception as err:
         print(f"Failed to connect to PostgreSQL: {err}", file=sys.stderr)
         sys.exit(1)
 
     try:
-        if args.operation == "determine":
-            if not args.repo:
-                print(
-                    "Error: --repo is required for determine operation", file=sys.stderr
-                )
-                sys.exit(1)
+        ensure_schema(conn)
 
-            config = None
-            if args.config_file:
-                with open(args.config_file, "r") as f:
-                    config = json.load(f)
+        config = None
+        config_file = getattr(args, "config_file", None)
+        if config_file:
+            with open(config_file, "r") as f:
+                config = json.load(f)
 
+        if args.operation == "determine":
             enable_subset_detection = not args.disable_subset_detection
             commits = determine_commits_to_benchmark(
                 conn=conn,
@@ -560,24 +969,6 @@ def main():
             print(" ".join(commits))
 
         elif args.operation == "mark":
-            if not args.repo:
-                print("Error: --repo is required for mark operation", file=sys.stderr)
-                sys.exit(1)
-            if not args.status:
-                print("Error: --status is required for mark operation", file=sys.stderr)
-                sys.exit(1)
-            if not args.shas:
-                print(
-                    "Error: commit SHAs are required for mark operation",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
-
-            config = None
-            if args.config_file:
-                with open(args.config_file, "r") as f:
-                    config = json.load(f)
-
             mark_commits(
                 conn=conn,
                 repo=args.repo,
@@ -588,11 +979,6 @@ def main():
             )
 
         elif args.operation == "query":
-            config = None
-            if args.config_file:
-                with open(args.config_file, "r") as f:
-                    config = json.load(f)
-
             if args.list_configs:
                 configs = get_unique_configs(conn)
                 print(f"Unique configs used: {len(configs)}", file=sys.stderr)
@@ -603,8 +989,7 @@ def main():
                         summary = f"(io-threads={first.get('io-threads', 'N/A')}, cluster={first.get('cluster_mode', 'N/A')}, tls={first.get('tls_mode', 'N/A')})"
                     print(f"  Config {i}: {summary}", file=sys.stderr)
             else:
-                commits = get_commits_by_config(conn, args.architecture, config)
-                count = len(commits)
+                count = count_commits_by_config(conn, args.architecture, config)
                 if config:
                     summary = ""
                     if isinstance(config, list) and len(config) > 0:
@@ -622,6 +1007,10 @@ def main():
         elif args.operation == "cleanup":
             cleanup_incomplete_commits(conn)
 
+        # Every operation runs as a single transaction; closing the
+        # connection without reaching this point rolls it back
+        conn.commit()
+
     finally:
         conn.close()
 
@@ -9,46 +9,51 @@ will automatically create new database columns.
 """
 
 import argparse
+import functools
+import io
 import json
+import operator
 import sys
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Set, Optional
+from typing import List, Dict, Any, Callable, Tuple, Set, Optional
 
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import execute_values
+
+# Optional faster JSON parser; the stdlib json module is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 DESCRIPTION_MAX_LENGTH = 500
 
+# Characters that must be backslash-escaped in COPY text format
+_COPY_TEXT_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+
+# Column types for the exact JSON scalar types; type() keeps bool apart from int
+_SCALAR_FIELD_TYPES = {
+    bool: "BOOLEAN",
+    int: "INTEGER",
+    float: "DOUBLE PRECISION",
+}
+
 
 def detect_field_type(value: Any) -> str:
     """Detect PostgreSQL column type from a sample value."""
-    if value is None:
-        return "TEXT"  # Default for unknown types
-    elif isinstance(value, bool):
-        return "BOOLEAN"
-    elif isinstance(value, int):
-        return "INTEGER"
-    elif isinstance(value, float):
-        return "DECIMAL(15,6)"  # Accommodate precision for metrics
-    elif isinstance(value, str):
-        # Special handling for timestamp fields
-        if "timestamp" in str(value).lower():
-            try:
-                datetime.fromisoformat(value.replace("Z", "+00:00"))
-                return "TIMESTAMPTZ"
-            except:
-                pass
-        # Determine string length for VARCHAR
-        if len(value) <= 50:
-            return "VARCHAR(50)"
-        elif len(value) <= 255:
-            return "VARCHAR(255)"
-        else:
-            return "TEXT"
-    else:
-        return "TEXT"
+    column_type = _SCALAR_FIELD_TYPES.get(type(value))
+    if column_type is not None:
+        return column_type
+    # Strings, None and anything else: TEXT rather than a VARCHAR sized from
+    # one sample, since storage is the same and a longer value in a later run
+    # would not fit. The timestamp field itself is typed by
+    # analyze_metrics_schema.
+    return "TEXT"
 
 
 def analyze_metrics_schema(metrics_data: List[Dict[str, Any]]) -> Dict[str, str]:
@@ -66,18 +71,29 @@ def analyze_metrics_schema(metrics_data: List[Dict[str, Any]]) -> Dict[str, str]
     schema["id"] = "SERIAL PRIMARY KEY"
     schema["created_at"] = "TIMESTAMPTZ DEFAULT NOW()"
 
-    # Analyze all fields in the data
-    all_fields = set()
+    # Analyze all fields in the data, keeping them in first-seen order (dict
+    # keys). Metrics almost always share one key set, so work per metric is a
+    # key-set difference; values are only read for fields still waiting on a
+    # non-null sample.
+    all_fields = {}
     field_samples = {}
+    unsampled = set()
 
     for metric in metrics_data:
-        for field, value in metric.items():
-            all_fields.add(field)
-            if field not in field_samples and value is not None:
-                field_samples[field] = value
+        keys = metric.keys()
+        new_fields = keys - all_fields.keys()
+        if new_fields:
+            all_fields.update((field, None) for field in keys if field in new_fields)
+            unsampled |= new_fields
+        if unsampled:
+            for field in unsampled & keys:
+                value = metric[field]
+                if value is not None:
+                    field_samples[field] = value
+            unsampled -= field_samples.keys()
 
     # Determine types for each field
-    for field in sorted(all_fields):
+    for field in all_fields:
         if field == "timestamp":
             schema[field] = "TIMESTAMPTZ NOT NULL"
         elif field in ["commit", "command"]:
@@ -118,24 +134,12 @@ def create_or_update_table(
     table_name: str,
 ) -> None:
     """Create table or add missing columns dynamically."""
-    with conn.cursor() as cur:
-        # Check if table exists
-        cur.execute(
-            """
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-            )
-        """,
-            (table_name,),
-        )
-        result = cur.fetchone()
-        if result is None:
-            table_exists = False
-        else:
-            table_exists = result[0]
+    # A table always has columns, so one catalog query answers both whether
+    # the table exists and which columns it already has
+    existing_columns = get_existing_columns(conn, table_name)
+    table_exists = bool(existing_columns)
 
+    with conn.cursor() as cur:
         if not table_exists:
             # Create new table with all required columns
             columns_def = []
@@ -156,24 +160,26 @@ def create_or_update_table(
             create_indexes(cur, table_name)
         else:
             # Table exists, check for missing columns
-            existing_columns = get_existing_columns(conn, table_name)
             missing_columns = []
 
             for field, column_type in required_schema.items():
                 if field not in existing_columns:
                     missing_columns.append((field, column_type))
 
-            # Add missing columns
-            for field, column_type in missing_columns:
-                alter_sql = sql.SQL("ALTER TABLE {} ADD COLUMN {} {}").format(
+            # Add missing columns in a single ALTER TABLE round-trip
+            if missing_columns:
+                alter_sql = sql.SQL("ALTER TABLE {} {}").format(
                     sql.Identifier(table_name),
-                    sql.Identifier(field),
-                    sql.SQL(column_type),
+                    sql.SQL(", ").join(
+                        sql.SQL("ADD COLUMN {} {}").format(
+                            sql.Identifier(field), sql.SQL(column_type)
+                        )
+                        for field, column_type in missing_columns
+                    ),
                 )
                 cur.execute(alter_sql)
-                print(f"Added new column: {field} ({column_type})")
-
-            if missing_columns:
+                for field, column_type in missing_columns:
+                    print(f"Added new column: {field} ({column_type})")
                 print(f"Added {len(missing_columns)} new columns to existing table")
 
     conn.commit()
@@ -215,6 +221,54 @@ def create_indexes(cur, table_name: str) -> None:
         cur.execute(index_sql)
 
 
+def _parse_timestamp(timestamp_str: Any) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp, returning None if it is missing or invalid."""
+    if not isinstance(timestamp_str, str):
+        return None
+    return _parse_timestamp_str(timestamp_str)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_timestamp_str(timestamp_str: str) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp string, returning None if it is invalid.
+
+    Cached because every metric of a commit carries the same commit time.
+    """
+    if not timestamp_str:
+        return None
+    try:
+        if timestamp_str.endswith("Z"):
+            timestamp_str = timestamp_str[:-1] + "+00:00"
+        return datetime.fromisoformat(timestamp_str)
+    except (TypeError, ValueError):
+        return None
+
+
+def _truncate_description(value: Any) -> Any:
+    """Cap description strings at DESCRIPTION_MAX_LENGTH characters."""
+    if isinstance(value, str) and len(value) > DESCRIPTION_MAX_LENGTH:
+        return value[:DESCRIPTION_MAX_LENGTH]
+    return value
+
+
+def _column_getter(column: str) -> Callable[[Dict[str, Any]], Any]:
+    """Return a function that extracts a column's value from a metric."""
+    if column == "timestamp":
+        # Special handling for timestamp
+        return lambda metric: _parse_timestamp(metric.get("timestamp"))
+    if column in ["group_description", "scenario_description"]:
+        return lambda metric: _truncate_description(metric.get(column))
+    # Direct field mapping since field names are now normalized
+    return operator.methodcaller("get", column)
+
+
+def _is_valid_metric(metric: Any) -> bool:
+    """Return True for metric dicts that carry the required fields."""
+    return bool(
+        isinstance(metric, dict) and metric.get("timestamp") and metric.get("commit")
+    )
+
+
 def convert_metrics_to_rows(
     metrics_data: List[Dict[str, Any]], column_order: List[str]
 ) -> Tuple[List[Tuple[Any, ...]], int]:
@@ -227,52 +281,73 @@ def convert_metrics_to_rows(
     Returns:
         Tuple of (list of tuples ready for PostgreSQL insertion, number of skipped entries).
     """
-    rows = []
-    skipped_count = 0
-
-    for i, metric in enumerate(metrics_data):
-        # Skip entries that are None or empty
-        if not metric or not isinstance(metric, dict):
-            print(f"  Skipping entry {i+1}: invalid data")
-            skipped_count += 1
-            continue
-
-        # Skip entries missing required fields
-        if not metric.get("timestamp") or not metric.get("commit"):
-            print(f"  Skipping entry {i+1}: missing required fields")
-            skipped_count += 1
-            continue
-
-        row = []
-        for column in column_order:
-            if column in ["id", "created_at"]:
-                # Skip auto-generated columns
-                continue
-            elif column == "timestamp":
-                # Special handling for timestamp
-                timestamp_str = metric.get("timestamp", "")
-                if timestamp_str:
-                    try:
-                        timestamp_obj = datetime.fromisoformat(
-                            timestamp_str.replace("Z", "+00:00")
-                        )
-                        row.append(timestamp_obj)
-                    except:
-                        row.append(None)
-                else:
-                    row.append(None)
-            elif column in ["group_description", "scenario_description"]:
-                value = metric.get(column)
-                if isinstance(value, str) and len(value) > DESCRIPTION_MAX_LENGTH:
-                    value = value[:DESCRIPTION_MAX_LENGTH]
-                row.append(value)
-            else:
-                # Direct field mapping since field names are now normalized
-                row.append(metric.get(column))
-        rows.append(tuple(row))
+    # Resolve how each column is read once, rather than per metric
+    getters = [
+        _column_getter(column)
+        for column in column_order
+        # Skip auto-generated columns
+        if column not in ["id", "created_at"]
+    ]
+
+    # Validate up front so the row build below runs over clean metrics only
+    valid_metrics = [metric for metric in metrics_data if _is_valid_metric(metric)]
+    skipped_count = len(metrics_data) - len(valid_metrics)
+
+    if skipped_count:
+        # One summary line per reason rather than a line per skipped entry
+        reasons = Counter(
+            # Entries that are None or empty vs. entries missing required fields
+            (
+                "invalid data"
+                if not metric or not isinstance(metric, dict)
+                else "missing required fields"
+            )
+            for metric in metrics_data
+            if not _is_valid_metric(metric)
+        )
+        for reason, count in reasons.items():
+            print(f"  Skipping {count} entries: {reason}")
+
+    rows = [tuple(getter(metric) for getter in getters) for metric in valid_metrics]
     return rows, skipped_count
 
 
+def _copy_text_value(value: Any) -> str:
+    """Render a value as one field of COPY text format (NULL is \\N)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_TEXT_ESCAPES)
+    if isinstance(value, (dict, list)):
+        # Nested metric fields are stored as JSON, not as their Python repr
+        return json.dumps(value).translate(_COPY_TEXT_ESCAPES)
+    return str(value)
+
+
+def copy_rows(
+    cur, table_name: str, column_order: List[str], rows: List[Tuple[Any, ...]]
+) -> None:
+    """Bulk-load rows into table_name with COPY FROM STDIN.
+
+    Args:
+        cur: Cursor to load through.
+        table_name: Name of the PostgreSQL table to load into.
+        column_order: Column names matching the position of values in each row.
+        rows: Row tuples as produced by convert_metrics_to_rows.
+    """
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text_value(value) for value in row))
+        buf.write("\n")
+    buf.seek(0)
+
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table_name),
+        sql.SQL(", ").join(sql.Identifier(col) for col in column_order),
+    )
+    cur.copy_expert(copy_sql, buf)
+
+
 def push_to_postgres(
     metrics_data: List[Dict[str, Any]],
     conn: Optional[psycopg2.extensions.connection],
@@ -327,18 +402,16 @@ def push_to_postgres(
             print(f"  ... and {len(rows) - 3} more")
         return len(rows)
 
-    # Build dynamic INSERT statement
-    insert_sql = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
-        sql.Identifier(table_name),
-        sql.SQL(", ").join(sql.Identifier(col) for col in column_order),
-    )
-
     if conn is None:
         raise ValueError("Database connection is required for inserting data")
 
     print(f"  Inserting {len(rows)} rows into {table_name}...")
     with conn.cursor() as cur:
-        execute_values(cur, insert_sql, rows)
+        # Don't wait for the WAL flush on commit. A crash can lose at most
+        # this just-committed batch, and the next synchronous commit on the
+        # server (e.g. marking the commits complete) flushes it anyway.
+        cur.execute("SET LOCAL synchronous_commit = off")
+        copy_rows(cur, table_name, column_order, rows)
         inserted_count = cur.rowcount
 
     print("  Committing transaction...")
@@ -351,40 +424,45 @@ def push_to_postgres(
     return len(rows)
 
 
-def process_commit_metrics(
+def _read_json(path: Path) -> Any:
+    """Parse a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(path.read_bytes())
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity literals that json.dump writes
+            pass
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_commit_metrics(
     commit_dir: Path,
-    conn: Optional[psycopg2.extensions.connection],
-    table_name: str,
-    dry_run: bool = False,
     test_type: str = "core",
     module: Optional[str] = None,
     module_commit: Optional[str] = None,
-) -> Tuple[int, bool]:
-    """Process metrics for a single commit directory.
+) -> Optional[List[Dict[str, Any]]]:
+    """Load and tag the metrics for a single commit directory.
 
     Args:
         commit_dir: Path to directory containing metrics.json file.
-        conn: PostgreSQL database connection.
-        table_name: Name of the PostgreSQL table to insert into.
-        dry_run: If True, only show what would be inserted without actually inserting.
         test_type: Test type identifier (e.g., 'core', 'fts') for filtering in dashboards.
         module: Module name being tested (e.g., 'valkey-search' for FTS tests).
         module_commit: Module commit SHA (for tracking module-specific versions).
 
     Returns:
-        Tuple of (number of metrics processed, whether any records were skipped).
+        List of metric dictionaries, or None if the directory has no metrics.
     """
     metrics_file = commit_dir / "metrics.json"
     if not metrics_file.exists():
         print(f"Skipping {commit_dir.name}: no metrics.json found")
-        return 0, True
+        return None
 
-    with open(metrics_file) as f:
-        metrics_data = json.load(f)
+    metrics_data = _read_json(metrics_file)
 
     if not metrics_data:
         print(f"Skipping {commit_dir.name}: empty metrics")
-        return 0, True
+        return None
 
     # Augment metrics with test_type, module, and module_commit (extension for FTS tests)
     for metric in metrics_data:
@@ -394,12 +472,7 @@ def process_commit_metrics(
         if module_commit:
             metric["module_commit"] = module_commit
 
-    print(f"\n=== Processing {commit_dir.name} ===")
-    count = push_to_postgres(metrics_data, conn, table_name, dry_run)
-
-    status = "Would insert" if dry_run else "Inserted"
-    print(f"{status} {count} metrics")
-    return count, False
+    return metrics_data
 
 
 def main() -> None:
@@ -492,27 +565,35 @@ def main() -> None:
 
         print(f"Found {len(commit_dirs)} commit directories to process")
 
-        total_processed = 0
-
+        # Load every commit first so the schema is analyzed, the table is
+        # updated and the rows are inserted once for the whole results set
+        all_metrics = []
         for i, commit_dir in enumerate(commit_dirs, 1):
-            print(f"\n[{i}/{len(commit_dirs)}] Processing {commit_dir.name}...")
+            print(f"\n[{i}/{len(commit_dirs)}] Loading {commit_dir.name}...")
             try:
-                count, was_skipped = process_commit_metrics(
+                metrics_data = load_commit_metrics(
                     commit_dir,
-                    conn,
-                    args.table_name,
-                    args.dry_run,
                     test_type=args.test_type,
                     module=args.module,
                     module_commit=args.module_commit,
                 )
-                total_processed += count
-                if was_skipped:
-                    print(f"Warning: Skipped {commit_dir.name} (no valid metrics)")
-                print(f"Completed {commit_dir.name} ({count} metrics)")
             except Exception as e:
                 print(f"Error processing {commit_dir.name}: {e}", file=sys.stderr)
                 sys.exit(1)
+            if metrics_data is None:
+                print(f"Warning: Skipped {commit_dir.name} (no valid metrics)")
+                continue
+            all_metrics.extend(metrics_data)
+            print(f"Loaded {commit_dir.name} ({len(metrics_data)} metrics)")
+
+        print(f"\n=== Pushing {len(all_metrics)} metrics ===")
+        try:
+            total_processed = push_to_postgres(
+                all_metrics, conn, args.table_name, args.dry_run
+            )
+        except Exception as e:
+            print(f"Error pushing metrics: {e}", file=sys.stderr)
+            sys.exit(1)
 
         status = "[DRY RUN] Would process" if args.dry_run else "Successfully processed"
         print(f"\n{status} {total_processed} total metrics")